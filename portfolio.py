@@ -4,12 +4,14 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from sklearn.covariance import LedoitWolf
+
+from simulation import simulate, simulate_best, tangency
 
 # --- CONFIG: Page and global styling ---
 st.set_page_config(page_title="Optimal Portfolio Management — Finance Modeling", layout="wide")
 
-st.markdown(
-    """
+_CSS = """
     <style>
 
     
@@ -136,9 +138,39 @@ st.markdown(
     }
     
     </style>
-    """,
-    unsafe_allow_html=True
-)
+    """
+
+st.markdown(_CSS, unsafe_allow_html=True)
+
+# --- DATA: Cached Yahoo Finance download ---
+# Tuple ticker bersifat hashable sehingga bisa dipakai sebagai kunci cache
+@st.cache_data(ttl=3600)
+def fetch_prices(tickers: tuple, start, end):
+    raw = yf.download(list(tickers), start=start, end=end, threads=True, progress=False)['Close']
+    # Unduhan yang gagal tidak raise, hanya menghasilkan kolom kosong/NaN.
+    # Exception tidak di-cache oleh Streamlit, jadi submit berikutnya akan mengunduh ulang.
+    missing = [ticker for ticker in tickers if ticker not in raw.columns or raw[ticker].isna().all()]
+    if missing:
+        raise ValueError(f"No data for ticker {', '.join(missing)}. Check the ticker or date range.")
+    return raw
+
+# --- MODEL: Cached Monte Carlo simulation ---
+# Bytes dari matriks return menjadi kunci hash yang stabil untuk cache
+@st.cache_data
+def run_mc(returns_bytes, n_assets, rf, scenarios, seed, show_frontier=True):
+    R = np.frombuffer(returns_bytes).reshape(-1, n_assets)
+    # Mean dan kovarians tidak bergantung pada skenario, cukup dihitung sekali
+    mu_daily = R.mean(axis=0)
+    # Shrinkage Ledoit-Wolf: lebih stabil daripada kovarians sampel untuk data ~1 tahun
+    Sigma_daily = LedoitWolf().fit(R).covariance_
+    if show_frontier:
+        mc = simulate(mu_daily, Sigma_daily, rf, scenarios, seed=seed, periods=252)
+    else:
+        # Tanpa scatter plot cukup portofolio terbaik saja
+        mc = simulate_best(mu_daily, Sigma_daily, rf, scenarios, seed=seed, periods=252)
+    # Solusi analitik sebagai pembanding hasil Monte Carlo
+    analytic = tangency(mu_daily, Sigma_daily, rf, periods=252)
+    return mc, analytic
 
 # --- SIDEBAR: Input Parameters (Tanpa Form Container) ---
 st.sidebar.image("logo.png", use_container_width=True)
@@ -169,110 +201,141 @@ simulations = st.sidebar.number_input(
     value=10000
 )
 
+show_frontier = st.sidebar.checkbox("Show Efficient Frontier", value=True)
+
 # Tombol submit di sidebar
 submitted = st.sidebar.button("Submit")
 
-if submitted:
+# Tombol untuk menghapus hasil analisis yang tersimpan
+if st.sidebar.button("Clear"):
+    st.session_state.pop('mc', None)
+
+# --- ANALYSIS PIPELINE ---
+# Dibungkus fungsi agar submit yang gagal cukup `return`; st.stop() di level
+# modul meninggalkan data parsial sebagai variabel global
+def run_analysis(ticker_input, risk_free_rate, start_date, end_date, scenarios, show_frontier):
     with st.spinner("Crunching numbers and fetching data... Please wait."):
         # --- MAIN LOGIC: Process input ---
-        # Proses ticker
-        stock_list = [ticker.strip() for ticker in ticker_input.split(",") if ticker.strip() != ""]
+        # Proses ticker; yfinance mengembalikan kolom huruf besar tanpa duplikat,
+        # jadi input dinormalisasi dengan cara yang sama (urutan input dipertahankan)
+        stock_list = list(dict.fromkeys(
+            ticker.strip().upper() for ticker in ticker_input.split(",") if ticker.strip() != ""
+        ))
         if len(stock_list) < 2:
             st.warning("Please enter at least 2 tickers.")
-            st.stop()
-
-        st.title("📊 Optimal Portfolio Management")
-        st.markdown("<hr style='margin-top:0; border-color:#34495e; margin-bottom:2rem;'>", unsafe_allow_html=True)
+            return
 
         # --- FETCH DATA WITH yfinance ---
-        stocks = {}
-        for ticker in stock_list:
-            try:
-                stocks[ticker] = yf.download(ticker, start=start_date, end=end_date)[['Close']]
-            except Exception as e:
-                st.warning(f"Warning: Could not fetch data for {ticker}: {e}")
-                st.stop()
-
-        price_df = pd.DataFrame()
-        for ticker, df in stocks.items():
-            if not df.empty:
-                price_df[ticker] = df['Close']
-            else:
-                st.warning(f"Warning: No data for ticker {ticker}. Check the ticker or date range.")
-                st.stop()
-        price_df.dropna(inplace=True)
-        stock_returns = price_df.pct_change().dropna()
+        try:
+            raw = fetch_prices(tuple(stock_list), start_date, end_date)
+        except Exception as e:
+            st.warning(f"Warning: Could not fetch data for {', '.join(stock_list)}: {e}")
+            return
+
+        # yfinance mengurutkan kolom secara alfabetis; kembalikan ke urutan input
+        price_df = raw[stock_list].dropna()
+        # Log-return langsung dari matriks harga (baris = tanggal, kolom = ticker)
+        P = price_df.to_numpy(dtype=np.float64)
+        stock_returns = np.log(P[1:] / P[:-1])
+        # Ledoit-Wolf butuh minimal dua baris return
+        if len(stock_returns) < 2:
+            st.warning("Not enough price history in the selected range.")
+            return
 
         # --- MONTE CARLO SIMULATIONS FOR PORTFOLIO OPTIMIZATION ---
-        scenarios = simulations
-        weights_array = np.zeros((scenarios, len(stock_list)))
-        returns_array = np.zeros(scenarios)
-        volatility_array = np.zeros(scenarios)
-        sharpe_array = np.zeros(scenarios)
-
-        np.random.seed(3)
-        for i in range(scenarios):
-            weights = np.random.random(len(stock_list))
-            weights /= np.sum(weights)
-            weights_array[i] = weights
-            returns_array[i] = np.sum(stock_returns.mean() * 252 * weights)
-            volatility_array[i] = np.sqrt(np.dot(weights.T, np.dot(stock_returns.cov() * 252, weights)))
-            sharpe_array[i] = (returns_array[i] - risk_free_rate / 100) / volatility_array[i]
-
-        max_idx = sharpe_array.argmax()
-        optimal_weights = weights_array[max_idx]
-        optimal_return = returns_array[max_idx]
-        optimal_volatility = volatility_array[max_idx]
-        optimal_sharpe = sharpe_array[max_idx]
-
-        # --- DISPLAY KEY METRICS ---
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.markdown(f"<div class='metric-box'>📈 Sharpe Ratio<br>{optimal_sharpe:.2f}</div>", unsafe_allow_html=True)
-        with col2:
-            st.markdown(f"<div class='metric-box'>💰 Annual Return<br>{optimal_return:.2%}</div>", unsafe_allow_html=True)
-        with col3:
-            st.markdown(f"<div class='metric-box'>📉 Volatility<br>{optimal_volatility:.2%}</div>", unsafe_allow_html=True)
-
-        # --- STOCK PERFORMANCE CHART ---
-        fig_performance = go.Figure()
-        for i, column in enumerate(price_df.columns):
-            fig_performance.add_trace(go.Scatter(
-                x=price_df.index, y=price_df[column], mode='lines', name=stock_list[i]
-            ))
-        fig_performance.update_layout(
-            title="Equal-Weighted Portfolio Stock Performance",
-            xaxis_title="",
-            yaxis_title="Total Value",
-            plot_bgcolor='#050915',
-            paper_bgcolor='#050915',
-            font=dict(color='white')
+        mc, analytic = run_mc(
+            stock_returns.tobytes(), len(stock_list), risk_free_rate / 100, scenarios, seed=3,
+            show_frontier=show_frontier
         )
-        st.plotly_chart(fig_performance, use_container_width=True)
-
-        # --- PIE CHART & SCATTER PLOT ---
-        st.markdown("<hr style='border-color:#34495e; margin:2rem 0;'>", unsafe_allow_html=True)
-
-        weights_df = pd.DataFrame({
-            'Stock': stock_list,
-            'Weight': optimal_weights
-        })
-        pie_chart = go.Figure(data=[go.Pie(
-            labels=weights_df['Stock'], values=weights_df['Weight'], hole=0.4
-        )])
-        pie_chart.update_layout(
-            title="Optimal Portfolio Allocation", 
-            font=dict(color='white'), paper_bgcolor="#050915"
+        if show_frontier:
+            weights_array, returns_array, volatility_array, sharpe_array = mc
+            max_idx = sharpe_array.argmax()
+            best = weights_array[max_idx], returns_array[max_idx], volatility_array[max_idx], sharpe_array[max_idx]
+        else:
+            weights_array = returns_array = volatility_array = sharpe_array = None
+            best = mc
+
+        # Disimpan di session_state agar interaksi widget lain tidak menghitung ulang
+        st.session_state['mc'] = dict(
+            weights=weights_array, returns=returns_array, vol=volatility_array, sharpe=sharpe_array,
+            best=best, analytic=analytic, price_df=price_df, stock_list=stock_list, scenarios=scenarios
         )
 
-        col4, col5 = st.columns([1, 2])
-        with col4:
-            st.plotly_chart(pie_chart, use_container_width=True)
-        with col5:
+# --- RESULTS ---
+def render_results(results):
+    stock_list = results['stock_list']
+    price_df = results['price_df']
+    scenarios = results['scenarios']
+    analytic = results['analytic']
+    returns_array, volatility_array, sharpe_array = results['returns'], results['vol'], results['sharpe']
+    show_frontier = sharpe_array is not None
+
+    optimal_weights = results['best'][0]
+    optimal_return = float(results['best'][1])
+    optimal_volatility = float(results['best'][2])
+    optimal_sharpe = float(results['best'][3])
+
+    if show_frontier:
+        # Subsampel untuk scatter plot; optimal di atas tetap dari array penuh
+        plot_idx = np.random.default_rng(0).choice(scenarios, size=min(scenarios, 2000), replace=False)
+
+    st.title("📊 Optimal Portfolio Management")
+    st.markdown("<hr style='margin-top:0; border-color:#34495e; margin-bottom:2rem;'>", unsafe_allow_html=True)
+
+    # --- DISPLAY KEY METRICS ---
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown(f"<div class='metric-box'>📈 Sharpe Ratio<br>{optimal_sharpe:.2f}</div>", unsafe_allow_html=True)
+    with col2:
+        st.markdown(f"<div class='metric-box'>💰 Annual Return<br>{optimal_return:.2%}</div>", unsafe_allow_html=True)
+    with col3:
+        st.markdown(f"<div class='metric-box'>📉 Volatility<br>{optimal_volatility:.2%}</div>", unsafe_allow_html=True)
+
+    # --- STOCK PERFORMANCE CHART ---
+    fig_performance = go.Figure()
+    for i, column in enumerate(price_df.columns):
+        fig_performance.add_trace(go.Scatter(
+            x=price_df.index, y=price_df[column], mode='lines', name=stock_list[i]
+        ))
+    fig_performance.update_layout(
+        title="Equal-Weighted Portfolio Stock Performance",
+        xaxis_title="",
+        yaxis_title="Total Value",
+        plot_bgcolor='#050915',
+        paper_bgcolor='#050915',
+        font=dict(color='white')
+    )
+    st.plotly_chart(fig_performance, use_container_width=True)
+
+    # --- PIE CHART & SCATTER PLOT ---
+    st.markdown("<hr style='border-color:#34495e; margin:2rem 0;'>", unsafe_allow_html=True)
+
+    weights_df = pd.DataFrame({
+        'Stock': stock_list,
+        'Weight': optimal_weights
+    })
+    weight_formats = {"Weight": "{:.2%}"}
+    if analytic is not None:
+        analytic_weights, analytic_return, analytic_volatility, analytic_sharpe = analytic
+        weights_df['Analytic Weight'] = analytic_weights
+        weight_formats["Analytic Weight"] = "{:.2%}"
+    pie_chart = go.Figure(data=[go.Pie(
+        labels=weights_df['Stock'], values=weights_df['Weight'], hole=0.4
+    )])
+    pie_chart.update_layout(
+        title="Optimal Portfolio Allocation", 
+        font=dict(color='white'), paper_bgcolor="#050915"
+    )
+
+    col4, col5 = st.columns([1, 2])
+    with col4:
+        st.plotly_chart(pie_chart, use_container_width=True)
+    with col5:
+        if show_frontier:
             scatter_fig = go.Figure()
-            scatter_fig.add_trace(go.Scatter(
-                x=volatility_array, y=returns_array, mode='markers',
-                marker=dict(color=sharpe_array, colorscale='Viridis', showscale=True),
+            scatter_fig.add_trace(go.Scattergl(
+                x=volatility_array[plot_idx], y=returns_array[plot_idx], mode='markers',
+                marker=dict(color=sharpe_array[plot_idx], colorscale='Viridis', showscale=True),
                 name='Portfolios'
             ))
             scatter_fig.add_trace(go.Scatter(
@@ -280,6 +343,12 @@ if submitted:
                 marker=dict(color='orange', size=12, line=dict(width=2, color='black')),
                 name='Optimal'
             ))
+            if analytic is not None:
+                scatter_fig.add_trace(go.Scatter(
+                    x=[analytic_volatility], y=[analytic_return], mode='markers',
+                    marker=dict(color='red', size=12, symbol='diamond', line=dict(width=2, color='black')),
+                    name='Analytic'
+                ))
             scatter_fig.update_layout(
                 title="Portfolio Optimization — Return vs Volatility",
                 xaxis_title="Annualized Volatility",
@@ -287,14 +356,16 @@ if submitted:
                 plot_bgcolor='#050915', paper_bgcolor='#050915', font=dict(color='white')
             )
             st.plotly_chart(scatter_fig, use_container_width=True)
+        else:
+            st.info("Efficient frontier is hidden. Enable 'Show Efficient Frontier' in the sidebar to plot all simulated portfolios.")
 
-        # --- TABLE OF OPTIMAL WEIGHTS ---
-        st.markdown("<hr style='border-color:#34495e; margin:2rem 0;'>", unsafe_allow_html=True)
+    # --- TABLE OF OPTIMAL WEIGHTS ---
+    st.markdown("<hr style='border-color:#34495e; margin:2rem 0;'>", unsafe_allow_html=True)
 
-        st.subheader("🔢 Optimal Portfolio Weights")
-        st.dataframe(weights_df.style.format({"Weight": "{:.2%}"}))
+    st.subheader("🔢 Optimal Portfolio Weights")
+    st.dataframe(weights_df.style.format(weight_formats))
 
-        st.markdown(f"""
+    st.markdown(f"""
 <div style="background-color:#1e2a47; padding: 10px; border-radius: 5px; margin-top: 10px;">
     <p style="margin: 0; color: white; font-size: 16px;">
         🧮 After <strong>{scenarios}</strong> Monte Carlo simulation trials, an allocation with the highest <strong>Sharpe Ratio</strong> of 
@@ -302,11 +373,21 @@ if submitted:
     </p>
 </div>
 """, unsafe_allow_html=True)
-        
-        # --- ANALYSIS ---
-        st.markdown("<hr style='border-color:#34495e; margin:2rem 0;'>", unsafe_allow_html=True)
 
+    if analytic is not None:
         st.markdown(f"""
+<div style="background-color:#1e2a47; padding: 10px; border-radius: 5px; margin-top: 10px;">
+    <p style="margin: 0; color: white; font-size: 16px;">
+        📐 The analytic tangency portfolio (long-only) reaches a <strong>Sharpe Ratio</strong> of 
+        <strong>{analytic_sharpe:.2f}</strong>, with an annual return of <strong>{analytic_return:.2%}</strong> and volatility of <strong>{analytic_volatility:.2%}</strong>.
+    </p>
+</div>
+""", unsafe_allow_html=True)
+        
+    # --- ANALYSIS ---
+    st.markdown("<hr style='border-color:#34495e; margin:2rem 0;'>", unsafe_allow_html=True)
+
+    st.markdown(f"""
         ### 📝 Analysis:
         The **Sharpe Ratio** measures risk-adjusted return by subtracting the risk-free rate from the portfolio’s return and dividing by its volatility. A higher Sharpe Ratio means the portfolio yields more return per unit of risk.
 
@@ -316,18 +397,18 @@ if submitted:
         - **Dynamic Analysis:** Input any valid stock tickers; the tool fetches data from Yahoo Finance and computes optimal allocations.
         """)
         
-        # Tentukan rating berdasarkan nilai optimal_sharpe
-        if optimal_sharpe < 1:
-            rating = "🔻 Poor"
-        elif optimal_sharpe < 2:
-            rating = "⚖️ Acceptable"
-        elif optimal_sharpe < 3:
-            rating = "👍 Good"
-        else:
-            rating = "🌟 Excellent"
-
-        # Tampilkan kesimpulan dalam container
-        st.markdown(f"""
+    # Tentukan rating berdasarkan nilai optimal_sharpe
+    if optimal_sharpe < 1:
+        rating = "🔻 Poor"
+    elif optimal_sharpe < 2:
+        rating = "⚖️ Acceptable"
+    elif optimal_sharpe < 3:
+        rating = "👍 Good"
+    else:
+        rating = "🌟 Excellent"
+
+    # Tampilkan kesimpulan dalam container
+    st.markdown(f"""
 <div style="background-color:#06452d; padding: 10px; border-radius: 5px; margin-top: 10px;">
     <p style="margin: 0; color: white; font-size: 16px;">
         💡 <strong>Conclusion:</strong> The portfolio's Sharpe Ratio is <strong>{optimal_sharpe:.2f}</strong>, 
@@ -336,28 +417,36 @@ if submitted:
 </div>
 """, unsafe_allow_html=True)
         
-        # --- SHARPE RATIO BENCHMARKS ---
-        st.markdown("<hr style='border-color:#34495e; margin:2rem 0;'>", unsafe_allow_html=True)
-
-        col_rule1, col_rule2, col_rule3, col_rule4 = st.columns(4)
-        with col_rule1:
-            st.markdown("<div class='metric-box-rule'>🔻 < 1<br>Poor</div>", unsafe_allow_html=True)
-        with col_rule2:
-            st.markdown("<div class='metric-box-rule'>⚖️ 1 to 2<br>Acceptable</div>", unsafe_allow_html=True)
-        with col_rule3:
-            st.markdown("<div class='metric-box-rule'>👍 2 to 3<br>Good</div>", unsafe_allow_html=True)
-        with col_rule4:
-            st.markdown("<div class='metric-box-rule'>🌟 > 3<br>Excellent</div>", unsafe_allow_html=True)
+    # --- SHARPE RATIO BENCHMARKS ---
+    st.markdown("<hr style='border-color:#34495e; margin:2rem 0;'>", unsafe_allow_html=True)
+
+    col_rule1, col_rule2, col_rule3, col_rule4 = st.columns(4)
+    with col_rule1:
+        st.markdown("<div class='metric-box-rule'>🔻 < 1<br>Poor</div>", unsafe_allow_html=True)
+    with col_rule2:
+        st.markdown("<div class='metric-box-rule'>⚖️ 1 to 2<br>Acceptable</div>", unsafe_allow_html=True)
+    with col_rule3:
+        st.markdown("<div class='metric-box-rule'>👍 2 to 3<br>Good</div>", unsafe_allow_html=True)
+    with col_rule4:
+        st.markdown("<div class='metric-box-rule'>🌟 > 3<br>Excellent</div>", unsafe_allow_html=True)
         
-        # --- DISCLAIMER ---
-        st.markdown("""
+    # --- DISCLAIMER ---
+    st.markdown("""
         <div class='disclaimer-box'>
     ⚠️ <b>Disclaimer:</b> This tool is for educational purposes only. Please do your own research before making any investment decisions.
     </div>
         """, unsafe_allow_html=True)
         
-        # --- FOOTER ---
-        st.markdown("""<hr style="border-top: 2px solid #2c3e50;">""", unsafe_allow_html=True)
-        st.markdown("<div class='footer-text'>Created by Abida Massi</div>", unsafe_allow_html=True)
+    # --- FOOTER ---
+    st.markdown("""<hr style="border-top: 2px solid #2c3e50;">""", unsafe_allow_html=True)
+    st.markdown("<div class='footer-text'>Created by Abida Massi</div>", unsafe_allow_html=True)
+
+if submitted:
+    # Hasil lama dibuang agar submit yang gagal tidak menampilkan data sebelumnya
+    st.session_state.pop('mc', None)
+    run_analysis(ticker_input, risk_free_rate, start_date, end_date, simulations, show_frontier)
+
+if 'mc' in st.session_state:
+    render_results(st.session_state['mc'])
 else:
     st.info("Please enter stock tickers and click 'Submit' in the sidebar to run the analysis.")
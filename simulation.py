@@ -0,0 +1,92 @@
+import numpy as np
+from numba import njit, prange
+
+
+# --- MONTE CARLO KERNEL ---
+# Dikompilasi ke kode native oleh Numba; prange membagi skenario ke semua core
+# tanpa overhead proses/pickling seperti multiprocessing.
+@njit(parallel=True, fastmath=True, cache=True)
+def _sim_kernel(W, mu, L, rf, periods):
+    scenarios, N = W.shape
+    rets = np.empty(scenarios, dtype=np.float32)
+    vols = np.empty(scenarios, dtype=np.float32)
+    sharpes = np.empty(scenarios, dtype=np.float32)
+    for i in prange(scenarios):
+        ret = np.float32(0.0)
+        for j in range(N):
+            ret += W[i, j] * mu[j]
+        # w' Sigma w = ||w' L||^2 karena Sigma = L L'
+        var = np.float32(0.0)
+        for k in range(N):
+            proj = np.float32(0.0)
+            for j in range(N):
+                proj += W[i, j] * L[j, k]
+            var += proj * proj
+        # Sharpe dari excess return per periode, lalu disetahunkan
+        std = np.sqrt(var)
+        sharpes[i] = (ret - rf) / std * np.sqrt(periods)
+        rets[i] = ret * periods
+        vols[i] = std * np.sqrt(periods)
+    return rets, vols, sharpes
+
+
+def _cov_factor(Sigma):
+    # Faktor L dengan Sigma = L L'; Cholesky jika positive definite,
+    # akar matriks via eigh jika Sigma hanya PSD (singular)
+    try:
+        return np.linalg.cholesky(Sigma)
+    except np.linalg.LinAlgError:
+        eigvals, eigvecs = np.linalg.eigh(Sigma)
+        return eigvecs * np.sqrt(np.clip(eigvals, 0, None))
+
+
+def _kernel_inputs(mu, Sigma, rf, periods):
+    # mu dan Sigma per periode (harian); rf tahunan dikonversi ke per periode.
+    # Faktorisasi tetap di float64; array simulasi cukup float32.
+    L = _cov_factor(Sigma).astype(np.float32)
+    mu = np.asarray(mu, dtype=np.float32)
+    return mu, L, np.float32(rf / periods), np.float32(periods)
+
+
+def evaluate(W, mu, Sigma, rf, periods=252):
+    # Statistik tahunan untuk matriks bobot W (satu baris per portofolio)
+    W = np.asarray(W, dtype=np.float32)
+    return _sim_kernel(W, *_kernel_inputs(mu, Sigma, rf, periods))
+
+
+def simulate(mu, Sigma, rf, scenarios, seed=3, periods=252):
+    # Bobot diambil di luar kernel agar hasil tetap reproducible untuk seed yang sama
+    W = np.random.default_rng(seed).dirichlet(np.ones(len(mu)), size=scenarios).astype(np.float32)
+    rets, vols, sharpes = evaluate(W, mu, Sigma, rf, periods)
+    return W, rets, vols, sharpes
+
+
+def simulate_best(mu, Sigma, rf, scenarios, seed=3, periods=252, chunk_size=2048):
+    # Versi streaming: skenario diproses per chunk dan hanya portofolio dengan
+    # Sharpe tertinggi yang disimpan, tanpa array sebesar `scenarios`
+    rng = np.random.default_rng(seed)
+    inputs = _kernel_inputs(mu, Sigma, rf, periods)
+    alpha = np.ones(len(mu))
+    best = None
+    for start in range(0, scenarios, chunk_size):
+        W = rng.dirichlet(alpha, size=min(chunk_size, scenarios - start)).astype(np.float32)
+        rets, vols, sharpes = _sim_kernel(W, *inputs)
+        i = sharpes.argmax()
+        if best is None or sharpes[i] > best[3]:
+            best = (W[i].copy(), rets[i], vols[i], sharpes[i])
+    return best
+
+
+def tangency(mu, Sigma, rf, periods=252):
+    # Portofolio tangensial analitik w* ~ Sigma^-1 (mu - rf), diproyeksikan ke
+    # bobot long-only; None jika Sigma singular atau tidak ada aset dengan bobot positif
+    try:
+        z = np.linalg.solve(Sigma, mu - rf / periods)
+    except np.linalg.LinAlgError:
+        return None
+    w = np.clip(z, 0, None)
+    if w.sum() <= 0:
+        return None
+    w /= w.sum()
+    rets, vols, sharpes = evaluate(w[np.newaxis, :], mu, Sigma, rf, periods)
+    return w, rets[0], vols[0], sharpes[0]